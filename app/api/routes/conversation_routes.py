@@ -1,5 +1,6 @@
 import uuid
 from fastapi import APIRouter, Depends, Query, Path
+from typing import Optional
 
 from app.controllers.conversation_controller import ConversationController
 from app.schemas.conversation import (
@@ -12,7 +13,7 @@ router = APIRouter(prefix="/api/conversations", tags=["Conversations"])
 @router.get("/user/{user_id}", response_model=PaginatedConversationResponse)
 async def get_user_conversations(
     user_id: int = Path(..., description="ID of the user"),
-    page: int = Query(1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
     limit: int = Query(20, description="Number of conversations per page"),
     conversation_controller: ConversationController = Depends()
 ) -> PaginatedConversationResponse:
@@ -21,7 +22,7 @@ async def get_user_conversations(
     """
     return await conversation_controller.get_user_conversations(
         user_id=user_id,
-        page=page,
+        cursor=cursor,
         limit=limit
     )
 
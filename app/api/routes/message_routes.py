@@ -20,13 +20,12 @@ async def send_message(
     """
     Send a message from one user to another
     """
-    print("currently in router")
     return await message_controller.send_message(message)
 
 @router.get("/conversation/{conversation_id}", response_model=PaginatedMessageResponse)
 async def get_conversation_messages(
     conversation_id: uuid.UUID = Path(..., description="ID of the conversation"),
-    page: int = Query(1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
     limit: int = Query(20, description="Number of messages per page"),
     message_controller: MessageController = Depends()
 ) -> PaginatedMessageResponse:
@@ -35,7 +34,7 @@ async def get_conversation_messages(
     """
     return await message_controller.get_conversation_messages(
         conversation_id=conversation_id,
-        page=page,
+        cursor=cursor,
         limit=limit
     )
 
@@ -43,7 +42,7 @@ async def get_conversation_messages(
 async def get_messages_before_timestamp(
     conversation_id: uuid.UUID = Path(..., description="ID of the conversation"),
     before_timestamp: datetime = Query(..., description="Get messages before this timestamp"),
-    page: int = Query(1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
     limit: int = Query(20, description="Number of messages per page"),
     message_controller: MessageController = Depends()
 ) -> PaginatedMessageResponse:
@@ -53,6 +52,6 @@ async def get_messages_before_timestamp(
     return await message_controller.get_messages_before_timestamp(
         conversation_id=conversation_id,
         before_timestamp=before_timestamp,
-        page=page,
+        cursor=cursor,
         limit=limit
     ) 
\ No newline at end of file
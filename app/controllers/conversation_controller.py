@@ -1,7 +1,10 @@
+from typing import Optional
 from app.models.cassandra_models import ConversationModel
 from fastapi import HTTPException, status
 import uuid
 
+from app.controllers.errors import DB_UNAVAILABLE_ERRORS, db_unavailable
+from app.controllers.pagination import decode_cursor, encode_cursor, invalid_cursor, invalid_cursor_errors
 from app.schemas.conversation import ConversationResponse, PaginatedConversationResponse
 
 
@@ -14,15 +17,25 @@ class ConversationController:
     async def get_user_conversations(
         self, 
         user_id: int, 
-        page: int = 1, 
+        cursor: Optional[str] = None, 
         limit: int = 20
     ) -> PaginatedConversationResponse:
         """
-        Get all conversations for a user with pagination.
+        Get all conversations for a user with cursor-based pagination.
         """
+        paging_state = decode_cursor(cursor)
         try:
-            conv_data = await ConversationModel.get_user_conversations(user_id, page, limit)
-            return PaginatedConversationResponse(**conv_data)
+            conv_data = await ConversationModel.get_user_conversations(user_id, paging_state, limit)
+            return PaginatedConversationResponse(
+                limit=conv_data["limit"],
+                next_cursor=encode_cursor(conv_data["paging_state"]),
+                has_more=conv_data["has_more"],
+                data=conv_data["data"]
+            )
+        except invalid_cursor_errors(paging_state):
+            raise invalid_cursor()
+        except DB_UNAVAILABLE_ERRORS:
+            raise db_unavailable()
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -35,7 +48,9 @@ class ConversationController:
         """
         try:
             conv = await ConversationModel.get_conversation(conversation_id)
-            return ConversationResponse(**conv)
+            return ConversationResponse.model_construct(**conv)
+        except DB_UNAVAILABLE_ERRORS:
+            raise db_unavailable()
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,24 @@
+"""
+Mapping of Cassandra driver errors to HTTP responses.
+"""
+from cassandra import OperationTimedOut, ReadTimeout, Unavailable, WriteTimeout
+from cassandra.cluster import NoHostAvailable
+from fastapi import HTTPException, status
+
+# Errors caused by the database being overloaded or unreachable; clients may retry these later.
+DB_UNAVAILABLE_ERRORS = (NoHostAvailable, OperationTimedOut, ReadTimeout, WriteTimeout, Unavailable)
+
+# Seconds a client should wait before retrying a request that hit DB_UNAVAILABLE_ERRORS.
+RETRY_AFTER_SECONDS = 1
+
+
+def db_unavailable() -> HTTPException:
+    """
+    Build a 503 response for DB_UNAVAILABLE_ERRORS.
+    The driver's error message (which can list every host tried) is not sent to the client.
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Database temporarily unavailable",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
@@ -1,12 +1,17 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import uuid
 
 from app.models.cassandra_models import ConversationModel, MessageModel
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
 
+from app.controllers.errors import DB_UNAVAILABLE_ERRORS, db_unavailable
+from app.controllers.pagination import decode_cursor, encode_cursor, invalid_cursor, invalid_cursor_errors
 from app.schemas.message import MessageCreate, MessageResponse, PaginatedMessageResponse
 
+# Validates a whole page of message rows in a single pydantic-core call.
+_MSG_LIST_ADAPTER = TypeAdapter(List[MessageResponse])
 
 
 class MessageController:
@@ -28,7 +33,9 @@ class MessageController:
             msg = await MessageModel.create_message(
                 conversation_id, message_data.sender_id, message_data.receiver_id, message_data.content
             )
-            return MessageResponse(**msg)
+            return MessageResponse.model_construct(**msg)
+        except DB_UNAVAILABLE_ERRORS:
+            raise db_unavailable()
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -38,15 +45,25 @@ class MessageController:
     async def get_conversation_messages(
         self, 
         conversation_id: uuid.UUID, 
-        page: int = 1, 
+        cursor: Optional[str] = None, 
         limit: int = 20
     ) -> PaginatedMessageResponse:
         """
-        Get all messages in a conversation with pagination.
+        Get all messages in a conversation with cursor-based pagination.
         """
+        paging_state = decode_cursor(cursor)
         try:
-            messages_paginated = await MessageModel.get_conversation_messages(conversation_id, page, limit)
-            return PaginatedMessageResponse(**messages_paginated)
+            messages_paginated = await MessageModel.get_conversation_messages(conversation_id, paging_state, limit)
+            return PaginatedMessageResponse.model_construct(
+                limit=messages_paginated["limit"],
+                next_cursor=encode_cursor(messages_paginated["paging_state"]),
+                has_more=messages_paginated["has_more"],
+                data=_MSG_LIST_ADAPTER.validate_python(messages_paginated["data"])
+            )
+        except invalid_cursor_errors(paging_state):
+            raise invalid_cursor()
+        except DB_UNAVAILABLE_ERRORS:
+            raise db_unavailable()
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -57,15 +74,27 @@ class MessageController:
         self, 
         conversation_id: uuid.UUID, 
         before_timestamp: datetime,
-        page: int = 1, 
+        cursor: Optional[str] = None, 
         limit: int = 20
     ) -> PaginatedMessageResponse:
         """
-        Get messages in a conversation before a specific timestamp with pagination.
+        Get messages in a conversation before a specific timestamp with cursor-based pagination.
         """
+        paging_state = decode_cursor(cursor)
         try:
-            messages_paginated = await MessageModel.get_messages_before_timestamp(conversation_id, before_timestamp, page, limit)
-            return PaginatedMessageResponse(**messages_paginated)
+            messages_paginated = await MessageModel.get_messages_before_timestamp(
+                conversation_id, before_timestamp, paging_state, limit
+            )
+            return PaginatedMessageResponse.model_construct(
+                limit=messages_paginated["limit"],
+                next_cursor=encode_cursor(messages_paginated["paging_state"]),
+                has_more=messages_paginated["has_more"],
+                data=_MSG_LIST_ADAPTER.validate_python(messages_paginated["data"])
+            )
+        except invalid_cursor_errors(paging_state):
+            raise invalid_cursor()
+        except DB_UNAVAILABLE_ERRORS:
+            raise db_unavailable()
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
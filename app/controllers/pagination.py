@@ -0,0 +1,56 @@
+"""
+Helpers for exposing Cassandra paging state to API clients as opaque cursors.
+"""
+import base64
+from typing import Optional
+
+from cassandra import InvalidRequest
+from cassandra.protocol import ProtocolException
+from fastapi import HTTPException, status
+
+# Errors Cassandra raises for a paging state it cannot resume from.
+INVALID_CURSOR_ERRORS = (InvalidRequest, ProtocolException)
+
+
+def invalid_cursor() -> HTTPException:
+    """
+    Build a 400 response for a cursor that was not issued by this API.
+    """
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def invalid_cursor_errors(paging_state: Optional[bytes]) -> tuple:
+    """
+    Exceptions to report as an invalid cursor: driver rejections only count when a cursor was sent.
+    """
+    return INVALID_CURSOR_ERRORS if paging_state is not None else ()
+
+
+def encode_cursor(paging_state: Optional[bytes]) -> Optional[str]:
+    """
+    Encode a Cassandra paging state as a URL-safe cursor string.
+    """
+    if paging_state is None:
+        return None
+    return base64.urlsafe_b64encode(paging_state).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[bytes]:
+    """
+    Decode a cursor string previously returned by encode_cursor.
+    """
+    if not cursor:
+        return None
+    # b64decode only validates after mapping altchars, so reject the standard-alphabet characters here.
+    if "+" in cursor or "/" in cursor:
+        raise invalid_cursor()
+    try:
+        paging_state = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True)
+    except ValueError:
+        raise invalid_cursor()
+    if not paging_state:
+        raise invalid_cursor()
+    return paging_state
@@ -2,19 +2,34 @@
 Cassandra client for the Messenger application.
 This provides a connection to the Cassandra database.
 """
+import asyncio
 import os
 import uuid
 import time  # Added import
-from typing import List, Dict, Any, Optional, Sequence, Union
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from datetime import datetime
 import logging
 
-from cassandra.cluster import Cluster, Session
+from cassandra.cluster import Cluster, ResultSet, Session
 from cassandra.auth import PlainTextAuthProvider
-from cassandra.query import SimpleStatement, dict_factory
+from cassandra.query import BatchStatement, BatchType, PreparedStatement, SimpleStatement, Statement, dict_factory
 
 logger = logging.getLogger(__name__)
 
+# A query is either a raw CQL string, a statement prepared with CassandraClient.prepare,
+# or an already built statement such as a batch.
+Query = Union[str, Statement]
+
+
+def _resolve_future(future: asyncio.Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+    """Complete an asyncio future unless it has already been cancelled."""
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
 class CassandraClient:
     """Singleton Cassandra client for the application."""
     
@@ -34,6 +49,8 @@ class CassandraClient:
         self.host = os.getenv("CASSANDRA_HOST", "localhost")
         self.port = int(os.getenv("CASSANDRA_PORT", "9042"))
         self.keyspace = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+        # Threads used by the driver to run request callbacks; requests themselves are pipelined per connection.
+        self.executor_threads = int(os.getenv("CASSANDRA_EXECUTOR_THREADS", "4"))
         
         self.cluster = None
         self.session = None
@@ -47,7 +64,7 @@ class CassandraClient:
         retry_delay = 5  # seconds
         for attempt in range(max_retries):
             try:
-                self.cluster = Cluster([self.host], port=self.port)
+                self.cluster = Cluster([self.host], port=self.port, executor_threads=self.executor_threads)
                 self.session = self.cluster.connect(self.keyspace)
                 self.session.row_factory = dict_factory
                 logger.info(f"Connected to Cassandra at {self.host}:{self.port}, keyspace: {self.keyspace}")
@@ -66,12 +83,52 @@ class CassandraClient:
             self.cluster.shutdown()
             logger.info("Cassandra connection closed")
     
-    def execute(self, query: str, params = None) -> List[Dict[str, Any]]:
+    def prepare(
+        self,
+        query: str,
+        consistency_level: Optional[int] = None,
+        serial_consistency_level: Optional[int] = None,
+    ) -> PreparedStatement:
+        """
+        Prepare a CQL query once so that later executions skip server-side parsing.
+        
+        Args:
+            query: The CQL query string, using `?` placeholders
+            consistency_level: The ConsistencyLevel every execution of the statement uses
+            serial_consistency_level: The serial ConsistencyLevel for conditional (IF ...) statements
+            
+        Returns:
+            The prepared statement
+        """
+        if not self.session:
+            self.connect()
+        statement = self.session.prepare(query)
+        if consistency_level is not None:
+            statement.consistency_level = consistency_level
+        if serial_consistency_level is not None:
+            statement.serial_consistency_level = serial_consistency_level
+        return statement
+    
+    @staticmethod
+    def _to_statement(query: Query, params = None, fetch_size: Optional[int] = None) -> Tuple[Statement, Any]:
+        """
+        Build an executable statement and its remaining parameters from a query.
+        """
+        if isinstance(query, PreparedStatement):
+            statement = query.bind(params or ())
+            if fetch_size is not None:
+                statement.fetch_size = fetch_size
+            return statement, None
+        if isinstance(query, Statement):
+            return query, None
+        return SimpleStatement(query, fetch_size=fetch_size), params or {}
+    
+    def execute(self, query: Query, params = None) -> List[Dict[str, Any]]:
             """
             Execute a CQL query.
             
             Args:
-                query: The CQL query string
+                query: The CQL query string or prepared statement
                 params: The parameters for the query
                 
             Returns:
@@ -81,34 +138,76 @@ class CassandraClient:
                 self.connect()
             
             try:
-                statement = SimpleStatement(query)
-                result = self.session.execute(statement, params or {})
+                statement, params = self._to_statement(query, params)
+                result = self.session.execute(statement, params)
                 return list(result)
             except Exception as e:
                 logger.error(f"Query execution failed: {str(e)}")
                 raise
         
-    def execute_async(self, query: str, params = None):
+    def batch(
+        self,
+        statements: Sequence[Tuple[Query, Any]],
+        consistency_level: Optional[int] = None,
+    ) -> BatchStatement:
+        """
+        Build a LOGGED batch that can be passed to execute or execute_async.
+        
+        Args:
+            statements: Sequence of (query string or prepared statement, parameters) pairs
+            consistency_level: The ConsistencyLevel for the batch as a whole
+            
+        Returns:
+            The batch statement
+        """
+        batch = BatchStatement(batch_type=BatchType.LOGGED, consistency_level=consistency_level)
+        for query, params in statements:
+            batch.add(*self._to_statement(query, params))
+        return batch
+        
+    def execute_async(
+        self,
+        query: Query,
+        params = None,
+        fetch_size: Optional[int] = None,
+        paging_state: Optional[bytes] = None,
+    ) -> "asyncio.Future[ResultSet]":
         """
-        Execute a CQL query asynchronously.
+        Execute a CQL query without blocking the event loop.
         
         Args:
-            query: The CQL query string
+            query: The CQL query string, prepared statement or batch
             params: The parameters for the query
+            fetch_size: The number of rows to fetch per page, if not the driver default
+            paging_state: The paging state returned by a previous page, if any
             
         Returns:
-            Async result object
+            Future resolved on the running event loop with a ResultSet whose current_rows
+            hold the first page and whose paging_state resumes the next one
         """
         if not self.session:
             self.connect()
         
         try:
-            statement = SimpleStatement(query)
-            return self.session.execute_async(statement, params or {})
+            statement, params = self._to_statement(query, params, fetch_size)
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            response_future = self.session.execute_async(statement, params, paging_state=paging_state)
         except Exception as e:
             logger.error(f"Async query execution failed: {str(e)}")
             raise
         
+        # Driver callbacks run on its event thread, so hand results back to the asyncio loop.
+        def on_success(rows):
+            loop.call_soon_threadsafe(_resolve_future, future, ResultSet(response_future, rows))
+        
+        def on_error(exc):
+            logger.error(f"Async query execution failed: {str(exc)}")
+            loop.call_soon_threadsafe(_resolve_future, future, None, exc)
+        
+        response_future.add_callbacks(on_success, on_error)
+        return future
+        
     def get_session(self) -> Session:
         """Get the Cassandra session."""
         if not self.session:
@@ -2,12 +2,98 @@
 Sample models for interacting with Cassandra tables.
 Students should implement these models based on their database schema design.
 """
+import asyncio
+import logging
+import secrets
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 
+from async_lru import alru_cache
+from cassandra import ConsistencyLevel
+from cassandra.util import datetime_from_uuid1
+
 from app.db.cassandra_client import cassandra_client
-from app.schemas.message import MessageResponse
+from app.schemas.conversation import ConversationResponse
+
+logger = logging.getLogger(__name__)
+
+# Reads served to clients can come from any local replica; writes, and the reads that
+# decide what to write, go through a local quorum.
+_READ_CL = ConsistencyLevel.LOCAL_ONE
+_WRITE_CL = ConsistencyLevel.LOCAL_QUORUM
+_SERIAL_CL = ConsistencyLevel.LOCAL_SERIAL
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Random node for uuid1 message IDs so they do not expose the host's MAC address;
+# the multicast bit marks it as not being a real hardware address (RFC 4122, 4.5).
+_NODE = secrets.randbits(48) | (1 << 40)
+
+# Statements are prepared once at import time so each call only ships bound values.
+_PS_SELECT_CONV_ACTIVITY = cassandra_client.prepare(
+    "SELECT last_message_at, listed_at FROM conversations WHERE conversation_id = ?",
+    _WRITE_CL,
+)
+_PS_INSERT_MSG = cassandra_client.prepare("""
+    INSERT INTO messages_by_conversation 
+    (conversation_id, sent_at, message_id, sender_id, receiver_id, content)
+    VALUES (?, ?, ?, ?, ?, ?)
+""", _WRITE_CL)
+_PS_UPDATE_CONV = cassandra_client.prepare("""
+    UPDATE conversations 
+    SET last_message_content = ?, last_message_at = ? 
+    WHERE conversation_id = ?
+    IF last_message_at = ?
+""", _WRITE_CL, _SERIAL_CL)
+_PS_UPDATE_CONV_LISTED_AT = cassandra_client.prepare("""
+    UPDATE conversations USING TIMESTAMP ?
+    SET listed_at = ?
+    WHERE conversation_id = ?
+""", _WRITE_CL)
+_PS_DELETE_CONV_BY_USER = cassandra_client.prepare("""
+    DELETE FROM conversations_by_user USING TIMESTAMP ?
+    WHERE user_id = ? AND last_message_at = ? AND conversation_id = ?
+""", _WRITE_CL)
+_PS_INSERT_CONV_BY_USER = cassandra_client.prepare("""
+    INSERT INTO conversations_by_user
+    (user_id, last_message_at, conversation_id, peer_id, last_message_content)
+    VALUES (?, ?, ?, ?, ?)
+    USING TIMESTAMP ?
+""", _WRITE_CL)
+_PS_SELECT_MSGS = cassandra_client.prepare("""
+    SELECT message_id, sent_at, sender_id, receiver_id, content, conversation_id
+    FROM messages_by_conversation WHERE conversation_id = ?
+""", _READ_CL)
+_PS_SELECT_MSGS_BEFORE = cassandra_client.prepare("""
+    SELECT message_id, sent_at, sender_id, receiver_id, content, conversation_id
+    FROM messages_by_conversation 
+    WHERE conversation_id = ? AND sent_at < ?
+""", _READ_CL)
+_PS_SELECT_CONVS_BY_USER = cassandra_client.prepare("""
+    SELECT conversation_id, peer_id, last_message_at, last_message_content
+    FROM conversations_by_user WHERE user_id = ?
+""", _READ_CL)
+# Read at quorum because get_conversation caches the result.
+_PS_SELECT_CONV = cassandra_client.prepare("""
+    SELECT conversation_id, user1_id, user2_id, last_message_at, last_message_content
+    FROM conversations WHERE conversation_id = ?
+""", _WRITE_CL)
+_PS_SELECT_CONV_BY_PAIR = cassandra_client.prepare(
+    "SELECT conversation_id FROM conversation_by_pair WHERE user_a = ? AND user_b = ?",
+    _WRITE_CL,
+)
+_PS_INSERT_CONV = cassandra_client.prepare("""
+    INSERT INTO conversations 
+    (conversation_id, user1_id, user2_id, created_at, last_message_at)
+    VALUES (?, ?, ?, ?, ?)
+    IF NOT EXISTS
+""", _WRITE_CL, _SERIAL_CL)
+_PS_INSERT_CONV_BY_PAIR = cassandra_client.prepare("""
+    INSERT INTO conversation_by_pair (user_a, user_b, conversation_id)
+    VALUES (?, ?, ?)
+    IF NOT EXISTS
+""", _WRITE_CL, _SERIAL_CL)
 
 
 class MessageModel:
@@ -16,7 +102,7 @@ class MessageModel:
     
     Considerations:
     - Efficient inserts into the messages_by_conversation table.
-    - Basic pagination implemented by slicing the results list (not recommended for large datasets).
+    - Pagination uses Cassandra paging state, so only one page of rows is fetched per request.
     - Filtering by timestamp is provided via the clustering column.
     """
     
@@ -29,27 +115,22 @@ class MessageModel:
     ) -> Dict[str, Any]:
         """
         Create a new message and update conversation info.
-        Inserts a new row into the messages_by_conversation table and updates the conversation.
-        """
-        created_at = datetime.utcnow()
-        message_id = uuid.uuid4()
-        # Insert message into the messages_by_conversation table.
-        query = """
-            INSERT INTO messages_by_conversation 
-            (conversation_id, sent_at, message_id, sender_id, receiver_id, content)
-            VALUES (%s, %s, %s, %s, %s, %s)
+        Inserts a new row into the messages_by_conversation table and updates the conversation
+        together with both participants' rows in conversations_by_user.
         """
+        # A time-based UUID carries its own timestamp, so sent_at is derived from it.
+        message_id = uuid.uuid1(node=_NODE)
+        created_at = datetime_from_uuid1(message_id)
+        # Cassandra timestamps have millisecond precision; truncate so comparisons match stored values.
+        created_at = created_at.replace(microsecond=created_at.microsecond // 1000 * 1000)
+        # The message insert and the conversation updates touch different tables, so run them concurrently.
         params = (conversation_id, created_at, message_id, sender_id, receiver_id, content)
-        cassandra_client.execute(query, params)
-        
-        # Update the conversation with the last message details.
-        query_conv = """
-            UPDATE conversations 
-            SET last_message_content = %s, last_message_at = %s 
-            WHERE conversation_id = %s
-        """
-        params_conv = (content, created_at, conversation_id)
-        cassandra_client.execute(query_conv, params_conv)
+        await asyncio.gather(
+            cassandra_client.execute_async(_PS_INSERT_MSG, params),
+            MessageModel._update_conversation_activity(
+                conversation_id, sender_id, receiver_id, content, created_at
+            ),
+        )
         
         return {
             "id": message_id,
@@ -60,56 +141,116 @@ class MessageModel:
             "conversation_id": conversation_id,
         }
     
+    @staticmethod
+    async def _update_conversation_activity(
+        conversation_id: uuid.UUID,
+        sender_id: int,
+        receiver_id: int,
+        content: str,
+        created_at: datetime,
+    ) -> None:
+        """
+        Advance the conversation's last message and both participants' conversation lists.
+        
+        The conversation row is updated with a lightweight transaction conditioned on the
+        last_message_at we read, so concurrent senders are serialized and last_message_at never
+        moves backwards. Only the sender whose update applies rewrites conversations_by_user.
+        
+        conversations.listed_at records the timestamp of the rows currently in conversations_by_user
+        and is written in the same batch as them. If an earlier batch never landed, listed_at still
+        points at the older rows, so this rewrite deletes those as well as the previous message's.
+        """
+        try:
+            while True:
+                # Fetch the previous activity timestamps so the stale conversations_by_user rows can be removed.
+                result = await cassandra_client.execute_async(_PS_SELECT_CONV_ACTIVITY, (conversation_id,))
+                conv = result.one()
+                prev_message_at = conv["last_message_at"] if conv else None
+                listed_at = conv["listed_at"] if conv else None
+                if prev_message_at is not None and prev_message_at >= created_at:
+                    # A newer message already owns the conversation's latest activity.
+                    return
+                result = await cassandra_client.execute_async(
+                    _PS_UPDATE_CONV, (content, created_at, conversation_id, prev_message_at)
+                )
+                if result.was_applied:
+                    break
+                # Another sender got there first: re-read and retry against what it wrote.
+                if result.one().get("last_message_at") is None:
+                    logger.warning("Conversation %s has no last_message_at; skipping update", conversation_id)
+                    return
+            
+
+            # Writing with the message time as the write timestamp means a delete issued for a newer
+            # message always wins over an older message's insert, whatever order the batches arrive in.
+            write_timestamp = (created_at - _EPOCH) // timedelta(microseconds=1)
+            stale_message_ats = {ts for ts in (listed_at, prev_message_at) if ts is not None}
+            statements = [(_PS_UPDATE_CONV_LISTED_AT, (write_timestamp, created_at, conversation_id))]
+            for user_id, peer_id in ((sender_id, receiver_id), (receiver_id, sender_id)):
+                for stale_at in stale_message_ats:
+                    statements.append(
+                        (_PS_DELETE_CONV_BY_USER, (write_timestamp, user_id, stale_at, conversation_id))
+                    )
+                statements.append(
+                    (_PS_INSERT_CONV_BY_USER, (user_id, created_at, conversation_id, peer_id, content, write_timestamp))
+                )
+            await cassandra_client.execute_async(cassandra_client.batch(statements, _WRITE_CL))
+        finally:
+            # Invalidate even on failure: a timed-out write may still have been applied.
+            ConversationModel.get_conversation.cache_invalidate(conversation_id)
+    
     @staticmethod
     async def get_conversation_messages(
-        conversation_id: uuid.UUID, page: int = 1, limit: int = 20
+        conversation_id: uuid.UUID, paging_state: Optional[bytes] = None, limit: int = 20
     ) -> Dict[str, Any]:
         """
         Get messages for a conversation with pagination.
-        Note: This demo fetches all rows matching the conversation_id and then slices.
-        This approach is acceptable for small volumes; for larger datasets consider using Cassandra paging state.
+        Only `limit` rows are fetched per call; the returned paging state resumes the next page.
         """
-        query = "SELECT * FROM messages_by_conversation WHERE conversation_id = %s"
         params = (conversation_id,)
-        results = cassandra_client.execute(query, params)
+        result = await cassandra_client.execute_async(
+            _PS_SELECT_MSGS, params, fetch_size=limit, paging_state=paging_state
+        )
+        results = result.current_rows
+        logger.debug("returned %d rows", len(results))
         
-        # Manual pagination: calculate slice indices.
-        total = len(results)
-        start = (page - 1) * limit
-        paginated_results = results[start:start + limit]
-        print("paginated_results", paginated_results)
+        # Plain dicts; MessageController validates the page in one TypeAdapter pass.
         data = [
-            MessageResponse(
-                id=msg["message_id"],
-                created_at=msg["sent_at"],
-                sender_id=msg["sender_id"],
-                receiver_id=msg["receiver_id"],
-                content=msg["content"],
-                conversation_id=msg["conversation_id"],
-            )
-            for msg in paginated_results
+            {
+                "id": msg["message_id"],
+                "created_at": msg["sent_at"],
+                "sender_id": msg["sender_id"],
+                "receiver_id": msg["receiver_id"],
+                "content": msg["content"],
+                "conversation_id": msg["conversation_id"],
+            }
+            for msg in results
         ]
 
-        return {"total": total, "page": page, "limit": limit, "data": data}
+        return {
+            "limit": limit,
+            "paging_state": result.paging_state,
+            "has_more": result.has_more_pages,
+            "data": data,
+        }
     
     @staticmethod
     async def get_messages_before_timestamp(
-        conversation_id: uuid.UUID, before_timestamp: datetime, page: int = 1, limit: int = 20
+        conversation_id: uuid.UUID,
+        before_timestamp: datetime,
+        paging_state: Optional[bytes] = None,
+        limit: int = 20,
     ) -> Dict[str, Any]:
         """
         Get messages before the given timestamp, paginated.
         """
-        query = """
-            SELECT * FROM messages_by_conversation 
-            WHERE conversation_id = %s AND sent_at < %s
-        """
         params = (conversation_id, before_timestamp)
-        results = cassandra_client.execute(query, params)
-        
-        total = len(results)
-        start = (page - 1) * limit
-        paginated_results = results[start:start + limit]
+        result = await cassandra_client.execute_async(
+            _PS_SELECT_MSGS_BEFORE, params, fetch_size=limit, paging_state=paging_state
+        )
+        results = result.current_rows
 
+        # Plain dicts; MessageController validates the page in one TypeAdapter pass.
         data = [
             {
                 "id": msg["message_id"],
@@ -119,10 +260,15 @@ class MessageModel:
                 "content": msg["content"],
                 "conversation_id": msg["conversation_id"],
             }
-            for msg in paginated_results
+            for msg in results
         ]
 
-        return {"total": total, "page": page, "limit": limit, "data": data}
+        return {
+            "limit": limit,
+            "paging_state": result.paging_state,
+            "has_more": result.has_more_pages,
+            "data": data,
+        }
 
 
 class ConversationModel:
@@ -130,73 +276,63 @@ class ConversationModel:
     Conversation model for interacting with the conversations-related table.
     
     Considerations:
-    - Retrieving conversations for a user (using ALLOW FILTERING) may not scale,
-      so in a production system a dedicated table or secondary indexes might be preferred.
-    - For simplicity we assume a conversation between two users contains exactly two IDs.
+    - Conversations for a user are read from the denormalized conversations_by_user table,
+      which is maintained by MessageModel.create_message.
+    - A conversation is between exactly two users, stored as user1_id < user2_id.
     """
     
     @staticmethod
     async def get_user_conversations(
-        user_id: int, page: int = 1, limit: int = 20
+        user_id: int, paging_state: Optional[bytes] = None, limit: int = 20
     ) -> Dict[str, Any]:
         """
         Get conversations for a user with pagination.
-        We use filtering with ALLOW FILTERING on the list_of_users field.
+        Reads the user's partition of conversations_by_user, which is already ordered by
+        last_message_at descending, one page at a time using Cassandra paging state.
         """
-        query = "SELECT * FROM conversations WHERE list_of_users CONTAINS %s ALLOW FILTERING"
         params = (user_id,)
-        results = cassandra_client.execute(query, params)
-        
-        # Sort by last_message_at descending.
-        results.sort(key=lambda x: x.get("last_message_at") or datetime.min, reverse=True)
-        total = len(results)
-        start = (page - 1) * limit
-        data = results[start:start + limit]
+        result = await cassandra_client.execute_async(
+            _PS_SELECT_CONVS_BY_USER, params, fetch_size=limit, paging_state=paging_state
+        )
+        results = result.current_rows
         
         conv_list = []
-        for conv in data:
-            # Assume list_of_users has at least two elements. We sort them to get consistent ordering.
-            users = conv.get("list_of_users", [])
-            if len(users) >= 2:
-                user1, user2 = sorted(users)[:2]
-            elif len(users) == 1:
-                user1 = user2 = users[0]
-            else:
-                user1 = user2 = None
-            conv_list.append({
-                "id": conv["conversation_id"],
-                "user1_id": user1,
-                "user2_id": user2,
-                "last_message_at": conv["last_message_at"],
-                "last_message_content": conv.get("last_message_content")
-            })
+        for conv in results:
+            peer_id = conv["peer_id"]
+            user1, user2 = (user_id, peer_id) if user_id <= peer_id else (peer_id, user_id)
+            conv_list.append(ConversationResponse.model_construct(
+                id=conv["conversation_id"],
+                user1_id=user1,
+                user2_id=user2,
+                last_message_at=conv["last_message_at"],
+                last_message_content=conv.get("last_message_content")
+            ))
         
-        return {"total": total, "page": page, "limit": limit, "data": conv_list}
+        return {
+            "limit": limit,
+            "paging_state": result.paging_state,
+            "has_more": result.has_more_pages,
+            "data": conv_list,
+        }
     
     @staticmethod
+    @alru_cache(maxsize=10_000, ttl=30)
     async def get_conversation(conversation_id: uuid.UUID) -> Dict[str, Any]:
         """
         Get a conversation by ID.
+        Results are cached in-process for up to 30 seconds and invalidated whenever this process
+        sends a message to the conversation; sends from other processes show up once the entry expires.
         """
-        query = "SELECT * FROM conversations WHERE conversation_id = %s"
         params = (conversation_id,)
-        results = cassandra_client.execute(query, params)
-        if not results:
+        result = await cassandra_client.execute_async(_PS_SELECT_CONV, params)
+        conv = result.one()
+        if not conv:
             raise Exception("Conversation not found")
         
-        conv = results[0]
-        users = conv.get("list_of_users", [])
-        if len(users) >= 2:
-            user1, user2 = sorted(users)[:2]
-        elif len(users) == 1:
-            user1 = user2 = users[0]
-        else:
-            user1 = user2 = None
-        
         return {
             "id": conv["conversation_id"],
-            "user1_id": user1,
-            "user2_id": user2,
+            "user1_id": conv["user1_id"],
+            "user2_id": conv["user2_id"],
             "last_message_at": conv["last_message_at"],
             "last_message_content": conv.get("last_message_content")
         }
@@ -207,35 +343,45 @@ class ConversationModel:
     ) -> Dict[str, Any]:
         """
         Get an existing conversation between two users or create a new one.
+        """
+        user_a, user_b = (user1_id, user2_id) if user1_id <= user2_id else (user2_id, user1_id)
+        conversation_id = await ConversationModel._get_or_create_conversation_id(user_a, user_b)
         
-        Since the conversations table uses only conversation_id as the primary key,
-        we scan for a conversation where user1 is in the list_of_users and then check if user2 is also present.
+        return {
+            "id": conversation_id,
+            "user1_id": user_a,
+            "user2_id": user_b,
+        }
+    
+    @staticmethod
+    @alru_cache(maxsize=100_000)
+    async def _get_or_create_conversation_id(user_a: int, user_b: int) -> uuid.UUID:
         """
-        query = "SELECT * FROM conversations WHERE list_of_users CONTAINS %s ALLOW FILTERING"
-        params = (user1_id,)
-        results = cassandra_client.execute(query, params)
+        Resolve the conversation ID for a pair of users, where user_a < user_b.
         
-        for conv in results:
-            if user2_id in conv.get("list_of_users", []):
-                return conv
+        The pair is looked up in conversation_by_pair. A new conversation's row is written first
+        and only then claims the pair with INSERT ... IF NOT EXISTS, so a claimed pair always points
+        at an existing conversation; when two processes race, both end up with the ID that won and
+        the loser's row is left as an unused orphan. Pair mappings never change once claimed, so
+        results are cached in-process; concurrent calls for the same pair share one lookup.
+        """
+        params = (user_a, user_b)
+        result = await cassandra_client.execute_async(_PS_SELECT_CONV_BY_PAIR, params)
+        existing = result.one()
         
-        # No conversation exists: create a new conversation.
+        if existing:
+            return existing["conversation_id"]
+        
+        # No conversation exists: write its row before claiming the pair for it.
         conversation_id = uuid.uuid4()
-        created_at = datetime.utcnow()
-        query_insert = """
-            INSERT INTO conversations 
-            (conversation_id, list_of_users, created_at, last_message_at)
-            VALUES (%s, %s, %s, %s)
-        """
-        params_insert = (conversation_id, [user1_id, user2_id], created_at, created_at)
-        cassandra_client.execute(query_insert, params_insert)
+        created_at = datetime.now(timezone.utc)
+        params_insert = (conversation_id, user_a, user_b, created_at, created_at)
+        await cassandra_client.execute_async(_PS_INSERT_CONV, params_insert)
         
-        return {
-            "id": conversation_id,
-            "user1_id": min(user1_id, user2_id),
-            "user2_id": max(user1_id, user2_id),
-            "created_at": created_at,
-            "last_message_at": created_at,
-            "last_message_content": None,
-            "list_of_users": [user1_id, user2_id]
-        }
+        params_insert_pair = (user_a, user_b, conversation_id)
+        result = await cassandra_client.execute_async(_PS_INSERT_CONV_BY_PAIR, params_insert_pair)
+        if not result.was_applied:
+            # Another request claimed the pair first; use its conversation.
+            conversation_id = result.one()["conversation_id"]
+        
+        return conversation_id
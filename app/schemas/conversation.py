@@ -15,11 +15,11 @@ class ConversationDetail(ConversationResponse):
     messages: List[MessageResponse] = Field(..., description="List of messages in conversation")
 
 class PaginatedConversationRequest(BaseModel):
-    page: int = Field(1, description="Page number for pagination")
+    cursor: Optional[str] = Field(None, description="Cursor returned by the previous page")
     limit: int = Field(20, description="Number of items per page")
 
 class PaginatedConversationResponse(BaseModel):
-    total: int = Field(..., description="Total number of conversations")
-    page: int = Field(..., description="Current page number")
     limit: int = Field(..., description="Number of items per page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for fetching the next page, if any")
+    has_more: bool = Field(..., description="Whether more conversations are available after this page")
     data: List[ConversationResponse] = Field(..., description="List of conversations") 
\ No newline at end of file
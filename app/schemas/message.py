@@ -18,12 +18,12 @@ class MessageResponse(MessageBase):
     conversation_id: uuid.UUID = Field(..., description="ID of the conversation")
 
 class PaginatedMessageRequest(BaseModel):
-    page: int = Field(1, description="Page number for pagination")
+    cursor: Optional[str] = Field(None, description="Cursor returned by the previous page")
     limit: int = Field(20, description="Number of items per page")
     before_timestamp: Optional[datetime] = Field(None, description="Get messages before this timestamp")
 
 class PaginatedMessageResponse(BaseModel):
-    total: int = Field(..., description="Total number of messages")
-    page: int = Field(..., description="Current page number")
     limit: int = Field(..., description="Number of items per page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for fetching the next page, if any")
+    has_more: bool = Field(..., description="Whether more messages are available after this page")
     data: List[MessageResponse] = Field(..., description="List of messages") 
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Script to migrate an existing Messenger keyspace to the current schema.
+
+Keyspaces created before conversations_by_user and conversation_by_pair were introduced
+have conversations rows that neither table knows about, so those conversations are missing
+from users' conversation lists and the next message between the same pair would start a new
+conversation. This script fills both tables from the existing conversations rows.
+
+Run it once after scripts/setup_db.py and before the application serves traffic.
+It is safe to run again.
+"""
+import os
+import logging
+from datetime import datetime, timedelta
+from cassandra import InvalidRequest
+from cassandra.cluster import Cluster
+from cassandra.query import SimpleStatement, dict_factory
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cassandra connection settings
+CASSANDRA_HOST = os.getenv("CASSANDRA_HOST", "localhost")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", "9042"))
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+
+# Number of conversations rows fetched per page while scanning
+FETCH_SIZE = 500
+
+EPOCH = datetime(1970, 1, 1)
+
+def connect_to_cassandra():
+    """Connect to Cassandra cluster."""
+    logger.info("Connecting to Cassandra...")
+    try:
+        cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT)
+        session = cluster.connect(CASSANDRA_KEYSPACE)
+        session.row_factory = dict_factory
+        logger.info("Connected to Cassandra!")
+        return cluster, session
+    except Exception as e:
+        logger.error(f"Failed to connect to Cassandra: {str(e)}")
+        raise
+
+def add_missing_columns(session):
+    """
+    Add the conversations columns introduced after the table was first created.
+
+    CREATE TABLE IF NOT EXISTS in setup_db.py leaves an existing table unchanged.
+    """
+    for column, cql_type in (("user1_id", "INT"), ("user2_id", "INT"), ("listed_at", "TIMESTAMP")):
+        try:
+            session.execute(f"ALTER TABLE conversations ADD {column} {cql_type}")
+            logger.info(f"Added conversations.{column}")
+        except InvalidRequest:
+            # The column already exists.
+            pass
+
+def conversation_users(conv):
+    """Return (user1_id, user2_id) for a conversations row, with user1_id < user2_id, or None."""
+    if conv.get("user1_id") is not None and conv.get("user2_id") is not None:
+        return conv["user1_id"], conv["user2_id"]
+    users = conv.get("list_of_users") or []
+    if len(users) != 2:
+        return None
+    user1, user2 = users
+    return (user1, user2) if user1 <= user2 else (user2, user1)
+
+def backfill(session):
+    """
+    Fill user1_id/user2_id, conversation_by_pair and conversations_by_user from conversations.
+
+    List rows are written with their last_message_at as the write timestamp, matching
+    MessageModel, so deletes issued by later messages always win over them.
+    """
+    update_users = session.prepare(
+        "UPDATE conversations SET user1_id = ?, user2_id = ? WHERE conversation_id = ?"
+    )
+    insert_pair = session.prepare("""
+        INSERT INTO conversation_by_pair (user_a, user_b, conversation_id)
+        VALUES (?, ?, ?)
+        IF NOT EXISTS
+    """)
+    insert_by_user = session.prepare("""
+        INSERT INTO conversations_by_user
+        (user_id, last_message_at, conversation_id, peer_id, last_message_content)
+        VALUES (?, ?, ?, ?, ?)
+        USING TIMESTAMP ?
+    """)
+    update_listed_at = session.prepare("""
+        UPDATE conversations USING TIMESTAMP ?
+        SET listed_at = ?
+        WHERE conversation_id = ?
+    """)
+
+    migrated = skipped = 0
+    rows = session.execute(SimpleStatement("SELECT * FROM conversations", fetch_size=FETCH_SIZE))
+    for conv in rows:
+        conversation_id = conv["conversation_id"]
+        users = conversation_users(conv)
+        if users is None:
+            logger.warning(f"Skipping conversation {conversation_id}: cannot determine its two users")
+            skipped += 1
+            continue
+        user1, user2 = users
+        session.execute(update_users, (user1, user2, conversation_id))
+
+        result = session.execute(insert_pair, (user1, user2, conversation_id))
+        if not result.was_applied and result.one()["conversation_id"] != conversation_id:
+            logger.warning(
+                f"Users {user1} and {user2} already map to conversation "
+                f"{result.one()['conversation_id']}; {conversation_id} keeps its messages but "
+                "new messages go to the mapped conversation"
+            )
+
+        last_message_at = conv.get("last_message_at")
+        if last_message_at is not None and conv.get("listed_at") is None:
+            write_timestamp = (last_message_at - EPOCH) // timedelta(microseconds=1)
+            content = conv.get("last_message_content")
+            for user_id, peer_id in ((user1, user2), (user2, user1)):
+                session.execute(
+                    insert_by_user, (user_id, last_message_at, conversation_id, peer_id, content, write_timestamp)
+                )
+            session.execute(update_listed_at, (write_timestamp, last_message_at, conversation_id))
+        migrated += 1
+
+    logger.info(f"Backfilled {migrated} conversations, skipped {skipped}")
+
+def main():
+    """Main function to backfill the denormalized tables."""
+    cluster = None
+
+    try:
+        cluster, session = connect_to_cassandra()
+        add_missing_columns(session)
+        # Prepared statements below reference the new columns, so refresh the schema first.
+        cluster.refresh_schema_metadata()
+        backfill(session)
+        logger.info("Backfill completed successfully!")
+    except Exception as e:
+        logger.error(f"Error during backfill: {str(e)}")
+        raise
+    finally:
+        if cluster:
+            cluster.shutdown()
+            logger.info("Cassandra connection closed")
+
+if __name__ == "__main__":
+    main()
@@ -71,13 +71,35 @@ def create_tables(session):
     session.execute("""
     CREATE TABLE IF NOT EXISTS conversations (
         conversation_id UUID PRIMARY KEY,
-        list_of_users LIST<INT>,
+        user1_id INT,
+        user2_id INT,
         last_message_content TEXT,
         last_message_at TIMESTAMP,
+        listed_at TIMESTAMP,
         created_at TIMESTAMP
     );
     """)
 
+    session.execute("""
+    CREATE TABLE IF NOT EXISTS conversations_by_user (
+        user_id INT,
+        last_message_at TIMESTAMP,
+        conversation_id UUID,
+        peer_id INT,
+        last_message_content TEXT,
+        PRIMARY KEY ((user_id), last_message_at, conversation_id)
+    ) WITH CLUSTERING ORDER BY (last_message_at DESC, conversation_id ASC);
+    """)
+
+    session.execute("""
+    CREATE TABLE IF NOT EXISTS conversation_by_pair (
+        user_a INT,
+        user_b INT,
+        conversation_id UUID,
+        PRIMARY KEY ((user_a, user_b))
+    );
+    """)
+
     
     logger.info("Tables created successfully.")
 